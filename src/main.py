@@ -10,14 +10,14 @@ import os
 import time
 import logging
 import resource
+from typing import TYPE_CHECKING
 
 from flask import Flask, request, jsonify, make_response
 
-from src.pipelines.cargar_pagos import ejecutar_carga_pagos
-from src.pipelines.pago_honorario import ejecutar_honorarios
-from src.pipelines.cuotas_concepto import ejecutar_cuotas_concepto
-from src.pipelines.historico import ejecutar_historico
-from src.utils.sheets_io import SheetsIO
+# Pipelines y SheetsIO (gspread + google-auth) se importan dentro del handler:
+# el health check de Cloud Run no paga ese costo en el cold start.
+if TYPE_CHECKING:
+    from src.utils.sheets_io import SheetsIO
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s %(message)s")
 logger = logging.getLogger("main")
@@ -52,7 +52,7 @@ def _mem_mb() -> float:
         return 0.0
 
 
-def _liberar_memoria(sheets: SheetsIO, paso: str):
+def _liberar_memoria(sheets: "SheetsIO", paso: str):
     """Invalida cache de Pro y fuerza garbage collection entre pasos."""
     sheets.invalidar_cache_pro()
     gc.collect()
@@ -81,6 +81,12 @@ def procesar_pagos():
     if not spreadsheet_id:
         return _json({"ok": False, "error": "spreadsheet_id requerido"}, 400)
 
+    from src.pipelines.cargar_pagos import ejecutar_carga_pagos
+    from src.pipelines.pago_honorario import ejecutar_honorarios
+    from src.pipelines.cuotas_concepto import ejecutar_cuotas_concepto
+    from src.pipelines.historico import ejecutar_historico
+    from src.utils.sheets_io import SheetsIO
+
     logger.info(
         f"[procesar-pagos] START spreadsheet={spreadsheet_id} "
         f"by={created_by} — RSS: {_mem_mb():.0f} MB"
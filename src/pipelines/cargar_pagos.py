@@ -6,23 +6,27 @@ Lee 'Informacion imagenes' + 'Pro', mapea por DNI, escribe en hojas mensuales.
 import logging
 import re
 import unicodedata
-from typing import Dict, Any, List
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Any, List, Tuple
 
-from src.utils.sheets_io import SheetsIO
-from src.utils.config import MESES_ES, MESES_ABREV, CANAL_TO_CODE
+from src.utils.sheets_io import SheetsIO, pad_fila
+from src.utils.config import MESES_ES_LOWER, MESES_ABREV, CANAL_TO_CODE
 from src.utils.parsers import (
     extraer_dni_desde_archivo,
-    parsear_fecha_flexible,
+    parsear_fechas,
+    parsear_dia_mes_texto,
     nombre_hoja_mes,
     formato_fecha_corta,
 )
 from src.utils.text import (
+    TABLA_ACENTOS,
     extraer_solo_numeros_crudos,
     limpiar_monto_sin_decimales,
     parsear_monto_float,
     normalize_canal,
-    contiene_pago_facil,
-    contiene_rapipago,
+    canal_por_emisor,
     es_banco_comafi,
     detectar_entidades,
 )
@@ -30,6 +34,10 @@ from src.utils.calendar_ar import calcular_dia_habil_del_mes
 
 logger = logging.getLogger(__name__)
 
+# Ancho mínimo de fila para indexar sin chequear len() campo por campo
+INFO_COLS = 11  # 'Informacion imagenes': A..K (archivo … destino)
+PRO_COLS = 10   # 'Pro': A..J (… cartera)
+
 # =============================================================================
 # Robustez Columna N (Cta. Destino)
 # - Prioridad: emisor → Banco / Pago Facil / Rapipago (como ya funcionaba)
@@ -98,13 +106,30 @@ _DIGITS_RX = re.compile(r"\D+")
 def _norm_txt(s: str) -> str:
     """Lower + sin acentos + trim."""
     s = (s or "").strip().lower()
+    if s.isascii():
+        return s
+    out = s.translate(TABLA_ACENTOS)
+    if out.isascii():
+        return out
+    # Camino lento: caracteres fuera de la tabla (marcas sueltas, otros alfabetos)
     s = unicodedata.normalize("NFD", s)
     s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
     return s
 
 
+# Acentos + separadores de _SEP_RX (el \s ASCII incluye \x1c-\x1f) en una sola tabla
+_COMPACT_TABLE = {
+    **TABLA_ACENTOS,
+    **{ord(ch): None for ch in " \t\n\r\f\v\x1c\x1d\x1e\x1f-./()"},
+}
+
+
 def _compact_txt(s: str) -> str:
     """Texto compacto sin separadores típicos (espacios, guiones, puntos, barras, paréntesis)."""
+    s = (s or "").strip().lower()
+    out = s.translate(_COMPACT_TABLE)
+    if out.isascii():
+        return out
     return _SEP_RX.sub("", _norm_txt(s))
 
 
@@ -124,10 +149,22 @@ for d in DESTINATARIOS:
         "p_digits": [p for p in pats_digits if p],
     })
 
+# Patrones aplanados en orden de prioridad: (patrón, es_digitos, namePago).
+# Un solo loop por fila; el primer match respeta el orden de DESTINATARIOS
+# (y dentro de cada uno, compactos antes que dígitos).
+_PATRONES_DESTINO: Tuple[Tuple[str, bool, str], ...] = tuple(
+    (p, es_digitos, d["namePago"])
+    for d in DESTINATARIOS_COMPILED
+    for es_digitos, pats in ((False, d["p_compact"]), (True, d["p_digits"]))
+    for p in pats
+)
+
 
+@lru_cache(maxsize=4096)
 def resolver_cta_destino(emisor: str, destino_raw: str) -> str:
     """
     Resuelve el texto final para la columna N (Cta. Destino).
+    Memoizada: en un lote se repiten pocos pares (emisor, destino_raw).
 
     Reglas:
     1) Mantener prioridad existente por emisor:
@@ -144,32 +181,36 @@ def resolver_cta_destino(emisor: str, destino_raw: str) -> str:
     raw = (destino_raw or "").strip()
 
     # (1) Prioridad existente por emisor (NO cambiar comportamiento actual)
-    if es_banco_comafi(emisor):
-        return "Banco"
-    if contiene_pago_facil(emisor):
-        return "Pago Facil"
-    if contiene_rapipago(emisor):
-        return "Rapipago"
+    canal = canal_por_emisor(emisor)
+    if canal:
+        return canal
 
     # (2) Match por patrones contra destino_raw
     raw_compact = _compact_txt(raw)
     raw_digits = _only_digits(raw)
 
-    for d in DESTINATARIOS_COMPILED:
-        for p in d["p_compact"]:
-            if p and p in raw_compact:
-                return d["namePago"]
-        for p in d["p_digits"]:
-            if p and p in raw_digits:
-                return d["namePago"]
+    for p, es_digitos, name_pago in _PATRONES_DESTINO:
+        if p in (raw_digits if es_digitos else raw_compact):
+            return name_pago
 
     # (3) Fallback
     return raw
 
 
+@lru_cache(maxsize=256)
+def _resolve_canal_code(destino_n: str) -> int:
+    """Código TPO_ORIG (columna W) para el texto de Cta. Destino; pocos valores distintos."""
+    return CANAL_TO_CODE.get(normalize_canal(destino_n), 0)
+
+
 def _tipo_pago(valor: str) -> str:
     """Determina tipo de pago desde texto de Pro."""
-    txt = str(valor or "").lower().strip()
+    return _tipo_pago_txt(str(valor or "").lower().strip())
+
+
+@lru_cache(maxsize=256)
+def _tipo_pago_txt(txt: str) -> str:
+    """Clasificación por palabra clave (el orden define la prioridad)."""
     if "cuota" in txt:
         return "Cuota"
     if "parcial" in txt:
@@ -181,36 +222,67 @@ def _tipo_pago(valor: str) -> str:
     return "No reconocido"
 
 
+# Código para columna F según tipo
+_CODIGO_TIPO = {
+    "Total": "PGTOT",
+    "Adelanto/Anticipo": "PGPREF",
+    "Cuota": "PGPREF",
+    "Parcial": "PGPR",
+}
+
+
 def _codigo_tipo(tipo: str) -> str:
     """Código para columna F."""
-    if tipo == "Total":
-        return "PGTOT"
-    if tipo in ("Adelanto/Anticipo", "Cuota"):
-        return "PGPREF"
-    if tipo == "Parcial":
-        return "PGPR"
-    return "VER"
-
-
-def _contar_cuotas_pagadas(row_pro: List, header_pro_lower: List[str], mes_nombre: str) -> int:
-    """Cuenta cuántas columnas 'pago' anteriores al mes actual tienen valor."""
-    pago_col_idx = -1
-    for k, h in enumerate(header_pro_lower):
-        if "pago" in h and mes_nombre in h:
-            pago_col_idx = k
+    return _CODIGO_TIPO.get(tipo, "VER")
+
+
+def _g(r: List, k: int, d: Any = "") -> Any:
+    """r[k] si la fila llega a la columna k; si no, el default d."""
+    return r[k] if k < len(r) else d
+
+
+def _indices_pago_por_mes(header_pro_lower: List[str]) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Retorna (pago_idxs, n_previas_por_mes):
+    - pago_idxs: índices de columnas de Pro que empiezan con 'pago', en orden.
+    - n_previas_por_mes: para cada mes (minúscula), cuántas de esas columnas
+      están antes de la columna 'pago <mes>' (siempre un prefijo de pago_idxs).
+    Se calcula una vez por corrida.
+    """
+    pago_idxs = [k for k, h in enumerate(header_pro_lower) if h.startswith("pago")]
+    n_previas_por_mes: Dict[str, int] = {}
+    for mes_nombre in MESES_ES_LOWER:
+        pago_col_idx = next(
+            (k for k, h in enumerate(header_pro_lower) if "pago" in h and mes_nombre in h),
+            -1,
+        )
+        n_previas_por_mes[mes_nombre] = sum(1 for k in pago_idxs if k < pago_col_idx)
+    return pago_idxs, n_previas_por_mes
+
+
+def _pagos_acumulados(row_pro: List, pago_idxs: List[int]) -> Tuple[int, ...]:
+    """
+    Prefijo de columnas pago con valor > 0 de una fila de Pro (hasta donde
+    llega la fila): acum[n] = cuántas de las primeras n tienen pago.
+    """
+    flags = []
+    for k in pago_idxs:
+        if k >= len(row_pro):
             break
+        try:
+            val = float(str(row_pro[k]).replace(".", "").replace(",", "."))
+            flags.append(val > 0)
+        except (ValueError, TypeError):
+            flags.append(False)
+    return tuple(accumulate(flags, initial=0))
+
 
-    cuotas = 0
-    if pago_col_idx > 0:
-        for k in range(pago_col_idx):
-            if header_pro_lower[k].startswith("pago"):
-                try:
-                    val = float(str(row_pro[k]).replace(".", "").replace(",", "."))
-                    if val > 0:
-                        cuotas += 1
-                except (ValueError, TypeError):
-                    pass
-    return cuotas
+def _contar_cuotas_pagadas(acum: Tuple[int, ...], n_previas: int) -> int:
+    """Cuenta cuántas columnas 'pago' anteriores al mes actual tienen valor (O(1))."""
+    if n_previas >= len(acum):
+        # Mismo error (y texto en la columna P) que indexar la fila corta
+        raise IndexError("list index out of range")
+    return acum[n_previas]
 
 
 def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
@@ -235,23 +307,49 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
 
     # Mapeo DNI → índice en Pro
     header_pro_lower = [str(h or "").lower() for h in header_pro]
+    pago_idxs, n_previas_por_mes = _indices_pago_por_mes(header_pro_lower)
+    g = _g  # local: evita el lookup global en los loops
     mapa_dni = {}
     for i, row in enumerate(data_pro):
-        dni = str(row[2] if len(row) > 2 else "").strip()
+        dni = str(g(row, 2)).strip()
         if dni:
             mapa_dni[dni] = i
 
     # Cargar entradas existentes para deduplicación
-    existing_entries = {}  # {nombre_hoja: set de "dni|dia|mesIdx"}
-    filas_por_hoja = {}    # {nombre_hoja: [filas]}
+    existing_entries: Dict[str, set] = defaultdict(set)    # {nombre_hoja: set de (dni, dia, mesIdx)}
+    filas_por_hoja: Dict[str, List] = defaultdict(list)    # {nombre_hoja: [filas]}
     estados = []
+    montos_pro: Dict[int, Tuple[float, float]] = {}  # idx_pro → (total_pactado, valor_cuota)
+    pagos_pro: Dict[int, Tuple[int, ...]] = {}       # idx_pro → prefijo de columnas pago con valor
+
+    # Títulos de hojas existentes (una sola llamada a la API)
+    existing_sheets = sheets.titulos_hojas()
+
+    # Pre-pasada: fechas parseadas (se reusan en el loop) y hojas destino
+    fechas = parsear_fechas(g(row, 3, None) for row in info_data)
+    hojas_destino = {nombre_hoja_mes(f["mesIdx"], f["anio"]) for f in fechas if isinstance(f, dict)}
+
+    # Entradas existentes de todas las hojas destino en un solo batchGet (A:C)
+    hojas_a_leer = sorted(h for h in hojas_destino if h in existing_sheets)
+    data_por_hoja = sheets.leer_hojas(hojas_a_leer, "A:C")
+    for hoja_nombre, data_mes in data_por_hoja.items():
+        for r in data_mes[1:]:
+            if len(r) > 2:
+                dni_exist = str(r[0]).strip()
+                parsed = parsear_dia_mes_texto(r[2]) if isinstance(r[2], str) else None
+                if dni_exist and parsed:
+                    existing_entries[hoja_nombre].add((dni_exist, parsed["dia"], parsed["mesIdx"]))
+    del data_por_hoja
 
     cargados = duplicados = errores = 0
+    errores_por_tipo: Counter = Counter()  # excepciones por fila, resumidas al final
 
     for i, row in enumerate(info_data):
         try:
+            row = pad_fila(row, INFO_COLS)
+
             # ─── Extraer DNI ───
-            archivo = str(row[0] if len(row) > 0 else "").strip()
+            archivo = str(row[0]).strip()
             dni = extraer_dni_desde_archivo(archivo)
 
             if not dni:
@@ -263,9 +361,10 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
                 errores += 1
                 continue
 
-            # ─── Parsear fecha ───
-            fecha_raw = row[3] if len(row) > 3 else None
-            fecha = parsear_fecha_flexible(fecha_raw)
+            # ─── Fecha (parseada en la pre-pasada) ───
+            fecha = fechas[i]
+            if isinstance(fecha, Exception):
+                raise fecha
             if not fecha:
                 estados.append("Fecha inválida")
                 errores += 1
@@ -278,55 +377,42 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
             # ─── Hoja destino ───
             hoja_nombre = nombre_hoja_mes(mes_idx, anio)
 
-            # Lazy load existing entries
-            if hoja_nombre not in existing_entries:
-                existing_entries[hoja_nombre] = set()
-                data_mes = sheets.leer_hoja_sin_header(hoja_nombre) if hoja_nombre in [s.title for s in sheets.sh.worksheets()] else []
-                for r in data_mes:
-                    if len(r) > 2:
-                        dni_exist = str(r[0]).strip()
-                        from src.utils.parsers import parsear_dia_mes_texto
-                        parsed = parsear_dia_mes_texto(r[2]) if isinstance(r[2], str) else None
-                        if dni_exist and parsed:
-                            existing_entries[hoja_nombre].add(f"{dni_exist}|{parsed['dia']}|{parsed['mesIdx']}")
-
-            if hoja_nombre not in filas_por_hoja:
-                filas_por_hoja[hoja_nombre] = []
-
             # ─── Deduplicación ───
-            clave = f"{dni}|{dia}|{mes_idx}"
+            clave = (dni, dia, mes_idx)
             if clave in existing_entries[hoja_nombre]:
                 estados.append(f"Duplicado en {hoja_nombre}")
                 duplicados += 1
                 continue
 
             # ─── Datos del cliente (Pro) ───
-            row_pro = data_pro[mapa_dni[dni]]
+            idx_pro = mapa_dni[dni]
+            row_pro = pad_fila(data_pro[idx_pro], PRO_COLS)
 
             # Monto
-            monto_raw = row[5] if len(row) > 5 else ""
+            monto_raw = row[5]
             monto_formateado = extraer_solo_numeros_crudos(monto_raw)
             monto_num = parsear_monto_float(monto_raw)
 
             # Emisor y canal
-            emisor = str(row[2] if len(row) > 2 else "").strip()
-            destino_raw = str(row[10] if len(row) > 10 else "").strip()
-
-            if not destino_raw:
-                destino_raw = str(row[10] if len(row) > 10 else "").strip()
+            emisor = str(row[2]).strip()
+            destino_raw = str(row[10]).strip()
 
             # ✅ ÚNICO CAMBIO FUNCIONAL: Columna N robusta
             destino_n = resolver_cta_destino(emisor, destino_raw)
 
             # Mantener W con el mismo mecanismo (pero usando el valor final de N)
-            canal_code = CANAL_TO_CODE.get(normalize_canal(destino_n), 0)
+            canal_code = _resolve_canal_code(destino_n)
 
             # Tipo de pago
-            tipo_texto = str(row_pro[5] if len(row_pro) > 5 else "").strip()
+            tipo_texto = str(row_pro[5]).strip()
             tipo = _tipo_pago(tipo_texto)
 
-            total_pactado = parsear_monto_float(row_pro[7] if len(row_pro) > 7 else "")
-            valor_cuota = parsear_monto_float(row_pro[8] if len(row_pro) > 8 else "")
+            # Montos de Pro: se parsean una vez por cliente, no por comprobante
+            montos = montos_pro.get(idx_pro)
+            if montos is None:
+                montos = (parsear_monto_float(row_pro[7]), parsear_monto_float(row_pro[8]))
+                montos_pro[idx_pro] = montos
+            total_pactado, valor_cuota = montos
 
             if tipo == "Total" and monto_num > 0 and monto_num < total_pactado:
                 tipo = "Parcial"
@@ -336,11 +422,15 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
             col_f = _codigo_tipo(tipo)
 
             # Cuotas pagadas
-            mes_nombre = MESES_ES[mes_idx].lower()
-            cuotas_pagadas = _contar_cuotas_pagadas(row_pro, header_pro_lower, mes_nombre)
+            mes_nombre = MESES_ES_LOWER[mes_idx]
+            acum = pagos_pro.get(idx_pro)
+            if acum is None:
+                # Fila sin rellenar: si le faltan columnas pago, la fila da error
+                acum = pagos_pro[idx_pro] = _pagos_acumulados(data_pro[idx_pro], pago_idxs)
+            cuotas_pagadas = _contar_cuotas_pagadas(acum, n_previas_por_mes[mes_nombre])
 
             # Cartera
-            cartera_raw = str(row_pro[9] if len(row_pro) > 9 else "").strip()
+            cartera_raw = str(row_pro[9]).strip()
             cartera = "Comafi" if es_banco_comafi(cartera_raw) else cartera_raw
 
             # Día hábil
@@ -352,23 +442,23 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
             # ─── Construir fila (25 columnas) ───
             nueva_fila = [
                 dni,                                              # A: DNI
-                str(row_pro[3] if len(row_pro) > 3 else ""),     # B: Nombre
+                str(row_pro[3]),                                   # B: Nombre
                 fecha_fmt,                                         # C: Fecha
                 monto_formateado,                                  # D: Importe
                 tipo,                                              # E: Concepto
                 col_f,                                             # F: Tipo de Pago
                 cuotas_pagadas + 1,                                # G: Nro de Cuota
-                str(row_pro[7] if len(row_pro) > 7 else ""),     # H: Total Cuotas
+                str(row_pro[7]),                                   # H: Total Cuotas
                 cartera,                                           # I: Cartera
                 "",                                                # J: Cartera Cta.
                 "",                                                # K: Producto Cta.
-                str(row_pro[4] if len(row_pro) > 4 else ""),     # L: Operador
+                str(row_pro[4]),                                   # L: Operador
                 detectar_entidades(cartera_raw),                   # M: Entidad
                 destino_n,                                         # N: Cta. Destino  
                 "",                                                # O: Observaciones
                 "",                                                # P: Transferido
                 dia_habil,                                         # Q: Nº Día
-                str(row_pro[8] if len(row_pro) > 8 else ""),     # R: ID
+                str(row_pro[8]),                                   # R: ID
                 1,                                                 # S: Tipo Doc
                 dni,                                               # T: NUMEDOCU
                 fecha_fmt,                                         # U: FECHPAGO
@@ -386,7 +476,12 @@ def ejecutar_carga_pagos(sheets: SheetsIO) -> Dict[str, Any]:
         except Exception as e:
             estados.append(f"Error: {e}")
             errores += 1
-            logger.exception(f"Error fila {i}: {e}")
+            errores_por_tipo[type(e).__name__] += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Error fila {i}: {e}", exc_info=True)
+
+    if errores_por_tipo:
+        logger.warning(f"Errores por tipo en carga: {dict(errores_por_tipo)}")
 
     # ─── Escritura batch ───
     for hoja_nombre, filas in filas_por_hoja.items():
@@ -4,8 +4,9 @@ Reemplaza el scheduler actualizarCuotasYConceptos de Apps Script.
 """
 
 import logging
+import re
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 from src.utils.sheets_io import SheetsIO
 from src.utils.config import MESES_ES, MESES_ABREV
@@ -14,20 +15,21 @@ from src.utils.parsers import nombre_hoja_mes
 
 logger = logging.getLogger(__name__)
 
+_YEAR_RX = re.compile(r"(\d{2,4})")
+_MESES_NORM = [normalize(m) for m in MESES_ES]  # normalizados una vez, en orden
 
-def _unique_key(dni: str, cartera: str) -> str:
-    return f"{normalize(dni)}_{normalize(cartera)}"
+
+def _unique_key(dni: str, cartera: str) -> Tuple[str, str]:
+    return (normalize(dni), normalize(cartera))
 
 
 def _parse_mes_anio_header(header: str):
     """Parsea 'Enero 26' o 'pago Enero 26' → (mesIdx, anio)."""
     h = normalize(header)
-    for i, mes in enumerate(MESES_ES):
-        mes_norm = normalize(mes)
+    for i, mes_norm in enumerate(_MESES_NORM):
         if mes_norm in h:
             # Buscar año
-            import re
-            m = re.search(r"(\d{2,4})", header)
+            m = _YEAR_RX.search(header)
             if m:
                 anio = int(m.group(1))
                 if anio < 100:
@@ -61,6 +63,20 @@ def _sumar_historia(row_pro: List, pago_cols: List[Dict], key_mes_actual: int) -
     return total
 
 
+def _datos_cuota(row_pro: List, col_valor: int) -> Tuple[int, float]:
+    """(cant_cuotas, val_cuota) de una fila de Pro; 999 cuotas si no hay dato válido."""
+    cant_cuotas = 999
+    try:
+        cant_cuotas = int(row_pro[7]) if len(row_pro) > 7 else 999
+    except (ValueError, TypeError):
+        pass
+    if cant_cuotas < 1:
+        cant_cuotas = 999
+
+    val_cuota = parsear_monto_float(row_pro[col_valor] if col_valor < len(row_pro) else "")
+    return cant_cuotas, val_cuota
+
+
 def _find_valor_cuota_col(header_pro: List[str], mes_idx: int, anio: int) -> int:
     """Encuentra columna de valor cuota del mes (no 'pago', no 'saldo')."""
     for k, h in enumerate(header_pro):
@@ -106,7 +122,9 @@ def ejecutar_cuotas_concepto(sheets: SheetsIO) -> Dict[str, Any]:
         return {"actualizadas": 0}
 
     # Leer hoja del mes
-    data_mes = sheets.leer_hoja_mes(hoja_nombre)
+    # Solo A..I (DNI, importe, cartera); las filas con datos solo más a la
+    # derecha no tienen E/G que reescribir
+    data_mes = sheets.leer_hoja_mes(hoja_nombre, "A:I")
     if len(data_mes) <= 1:
         return {"actualizadas": 0}
 
@@ -114,6 +132,8 @@ def ejecutar_cuotas_concepto(sheets: SheetsIO) -> Dict[str, Any]:
     conceptos = []
     cuotas = []
     acumulador = {}  # {key: monto_acumulado_mes}
+    historias: Dict[int, float] = {}  # idx_pro → pagos de meses previos (Pro no cambia en la corrida)
+    datos_cuota: Dict[int, Tuple[int, float]] = {}  # idx_pro → (cant_cuotas, val_cuota)
     actualizadas = 0
 
     for i in range(1, len(data_mes)):
@@ -131,18 +151,15 @@ def ejecutar_cuotas_concepto(sheets: SheetsIO) -> Dict[str, Any]:
             idx_pro = mapa[key]
             row_pro = data_pro[idx_pro]
 
-            cant_cuotas = 999
-            try:
-                cant_cuotas = int(row_pro[7]) if len(row_pro) > 7 else 999
-            except (ValueError, TypeError):
-                pass
-            if cant_cuotas < 1:
-                cant_cuotas = 999
-
-            val_cuota = parsear_monto_float(row_pro[col_valor] if col_valor < len(row_pro) else "")
+            datos = datos_cuota.get(idx_pro)
+            if datos is None:
+                datos = datos_cuota[idx_pro] = _datos_cuota(row_pro, col_valor)
+            cant_cuotas, val_cuota = datos
 
             if val_cuota > 0:
-                historia = _sumar_historia(row_pro, pago_cols, key_mes_actual)
+                historia = historias.get(idx_pro)
+                if historia is None:
+                    historia = historias[idx_pro] = _sumar_historia(row_pro, pago_cols, key_mes_actual)
                 acum_previo = acumulador.get(key, 0.0)
                 estado = historia + acum_previo + pago_fila
 
@@ -4,9 +4,10 @@ Deja el resultado visible en "Informacion imagenes" columna Q.
 """
 
 import logging
-from typing import Dict, Any, List
+from itertools import islice
+from typing import Dict, Any, List, Tuple
 
-from src.utils.sheets_io import SheetsIO
+from src.utils.sheets_io import SheetsIO, pad_fila
 from src.utils.config import HEADERS_MES
 from src.utils.parsers import (
     extraer_dni_honorario,
@@ -26,6 +27,9 @@ from src.utils.calendar_ar import calcular_dia_habil_del_mes
 logger = logging.getLogger(__name__)
 
 COLS_OUT = len(HEADERS_MES)
+RANGO_MES = "A:Y"  # columnas de HEADERS_MES (COLS_OUT): base_row no usa más allá de Y
+INFO_COLS = 6   # 'Informacion imagenes': A..F (archivo … monto) para el pre-filtrado
+PRO_COLS = 10   # 'Pro': A..J (… cartera)
 
 # "Informacion imagenes": Q es columna 17 (1-based), en get_all_values está en índice 16 (0-based)
 INFO_Q_IDX = 16
@@ -62,12 +66,21 @@ def _es_honorario_existente(row_vals: List[Any]) -> bool:
     return _is_truthy(y_val) or (j_val != "")
 
 
-def _build_dedupe_key(dni: str, dia: int, mes_idx: int, monto_raw: Any) -> str:
+def _indice_dni(data: List[List[Any]]) -> Dict[str, int]:
+    """DNI (col A) → última fila con ese DNI; salta el header y las filas sin DNI."""
+    return {
+        d: r
+        for r in range(1, len(data))
+        if (d := str(data[r][0] if data[r] else "").strip())
+    }
+
+
+def _build_dedupe_key(dni: str, dia: int, mes_idx: int, monto_sin: str) -> Tuple[str, int, int, str]:
     """
-    Key de dedupe: DNI + día + mesIdx (0-based) + montoSinDec (estable).
+    Key de dedupe: (DNI, día, mesIdx 0-based, montoSinDec) — tupla, sin formatear string.
+    monto_sin ya limpio (limpiar_monto_sin_decimales), se calcula una vez por item.
     """
-    monto_sin = limpiar_monto_sin_decimales(monto_raw)
-    return f"{dni}|{dia}|{mes_idx}|{monto_sin}"
+    return (dni, dia, mes_idx, monto_sin)
 
 
 def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
@@ -93,18 +106,18 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
         # if q_actual.startswith("✅ HON OK") or q_actual.startswith("⚠️ HON DUP"):
         #     continue
 
-        archivo = str(row[0] if len(row) > 0 else "").strip()
+        row = pad_fila(row, INFO_COLS)
+        archivo = str(row[0]).strip()
         dni = extraer_dni_honorario(archivo)
         if not dni:
             continue
 
-        fecha_raw = row[3] if len(row) > 3 else None
-        fecha = parsear_fecha_flexible(fecha_raw)
+        fecha = parsear_fecha_flexible(row[3])
         if not fecha:
             marcas_q[i] = "❌ HON ERROR: Fecha inválida"
             continue
 
-        monto_raw = row[5] if len(row) > 5 else ""
+        monto_raw = row[5]
         if not str(monto_raw).strip():
             marcas_q[i] = "❌ HON ERROR: Monto vacío"
             continue
@@ -114,6 +127,7 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
             "idx": i,
             "dni": dni,
             "monto_raw": monto_raw,
+            "monto_sin": limpiar_monto_sin_decimales(monto_raw),
             "dia": fecha["dia"],
             "mesIdx": fecha["mesIdx"],
             "anio": fecha["anio"],
@@ -130,6 +144,38 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
 
     procesados = duplicados = sin_base = 0
 
+    # Memo por corrida compartido entre grupos: el mes anterior de un grupo
+    # suele ser la hoja de otro. Se invalida la hoja al escribirle filas.
+    sheet_cache: Dict[str, List[List[Any]]] = {}
+    dni_index_cache: Dict[str, Dict[str, int]] = {}
+
+    def get_sheet(nombre: str) -> List[List[Any]]:
+        if nombre not in sheet_cache:
+            sheet_cache[nombre] = sheets.leer_hoja_mes(nombre, RANGO_MES) or []
+        return sheet_cache[nombre]
+
+    def get_dni_index(nombre: str) -> Dict[str, int]:
+        """DNI → última fila (índice en la hoja) con ese DNI."""
+        if nombre not in dni_index_cache:
+            dni_index_cache[nombre] = _indice_dni(get_sheet(nombre))
+        return dni_index_cache[nombre]
+
+    # PRO no cambia durante la corrida: índice DNI → fila (lazy, una vez)
+    pro_by_dni = None
+
+    # Prefetch en un solo batchGet: hoja de cada grupo + su mes anterior. Solo
+    # las que ya existen; una faltante se crea recién si se necesita (como antes).
+    nombres_mes = set()
+    for key in grupos:
+        anio_g, mes_g = [int(x) for x in key.split("-")]
+        prev = _mes_anterior(anio_g, mes_g)
+        nombres_mes.add(nombre_hoja_mes(mes_g, anio_g))
+        nombres_mes.add(nombre_hoja_mes(prev["mesIdx"], prev["anio"]))
+    existentes = sheets.titulos_hojas()
+    for nombre, data in sheets.leer_hojas(sorted(nombres_mes & existentes), RANGO_MES).items():
+        ancho = max((len(r) for r in data), default=0)  # mismo relleno que leer_hoja_mes
+        sheet_cache[nombre] = [pad_fila(r, ancho) for r in data]
+
     # =========================================================
     # 2) PROCESAMIENTO POR MES
     # =========================================================
@@ -137,36 +183,32 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
         anio, mes_idx = [int(x) for x in key.split("-")]
         hoja_nombre = nombre_hoja_mes(mes_idx, anio)
 
-        data_mes = sheets.leer_hoja_mes(hoja_nombre) or []
+        data_mes = get_sheet(hoja_nombre)
 
-        # Índices rápidos
-        last_row_by_dni: Dict[str, int] = {}
+        # Índices rápidos (el de DNI se comparte con el fallback "mes anterior")
+        last_row_by_dni = get_dni_index(hoja_nombre)
         honorario_keys = set()
+        # Solo interesan keys de DNIs que trae este grupo (las demás nunca se consultan)
+        item_dnis = {it["dni"] for it in items}
 
         # =========================================
-        # CONSTRUIR ÍNDICES EXISTENTES
+        # CONSTRUIR ÍNDICES EXISTENTES (honorarios ya cargados)
         # =========================================
-        for r in range(len(data_mes) - 1, 0, -1):
-            row_vals = data_mes[r]
-            if not row_vals:
+        for row_vals in islice(data_mes, 1, None):
+            # Para dedupe hacen falta fecha (C idx 2) y monto (V idx 21): el
+            # chequeo de largo va primero, es más barato que el de honorario.
+            if len(row_vals) <= 21:
                 continue
 
-            dni_val = str(row_vals[0] if len(row_vals) > 0 else "").strip()
-            if not dni_val:
+            dni_val = str(row_vals[0]).strip()
+            if dni_val not in item_dnis:  # incluye DNI vacío: los items siempre traen DNI
                 continue
 
-            if dni_val not in last_row_by_dni:
-                last_row_by_dni[dni_val] = r
-
             # ✅ criterio robusto (Y truthy OR J con valor)
             if not _es_honorario_existente(row_vals):
                 continue
 
-            # Para dedupe: fecha (C idx 2) y monto (V idx 21)
-            if len(row_vals) <= 21:
-                continue
-
-            fecha_val = row_vals[2] if len(row_vals) > 2 else ""
+            fecha_val = row_vals[2]
             parsed = parsear_dia_mes_texto(str(fecha_val))
             if not parsed:
                 continue
@@ -175,7 +217,7 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
                 dni=dni_val,
                 dia=parsed["dia"],
                 mes_idx=parsed["mesIdx"],
-                monto_raw=row_vals[21],
+                monto_sin=limpiar_monto_sin_decimales(row_vals[21]),
             )
             honorario_keys.add(dedupe_key)
 
@@ -185,9 +227,6 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
         prev_data = None
         prev_by_dni = None
         prev_nombre = None
-        
-        data_pro = None
-        pro_by_dni = None
 
         appends: List[List[Any]] = []
 
@@ -196,7 +235,7 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
                 dni=it["dni"],
                 dia=it["dia"],
                 mes_idx=it["mesIdx"],
-                monto_raw=it["monto_raw"],
+                monto_sin=it["monto_sin"],
             )
 
             # 🛑 DEDUPE REAL: si ya existe, NO escribir
@@ -218,12 +257,8 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
                 if prev_data is None:
                     prev = _mes_anterior(anio, mes_idx)
                     prev_nombre = nombre_hoja_mes(prev["mesIdx"], prev["anio"])
-                    prev_data = sheets.leer_hoja_mes(prev_nombre) or []
-                    prev_by_dni = {}
-                    for rr in range(len(prev_data) - 1, 0, -1):
-                        d = str(prev_data[rr][0] if len(prev_data[rr]) > 0 else "").strip()
-                        if d and d not in prev_by_dni:
-                            prev_by_dni[d] = rr
+                    prev_data = get_sheet(prev_nombre)
+                    prev_by_dni = get_dni_index(prev_nombre)
 
                 if prev_by_dni and it["dni"] in prev_by_dni:
                     base_row = list(prev_data[prev_by_dni[it["dni"]]])
@@ -239,29 +274,29 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
                                     pro_by_dni[d] = r_pro
                     
                     if pro_by_dni and it["dni"] in pro_by_dni:
-                        row_pro = pro_by_dni[it["dni"]]
-                        cartera_raw = str(row_pro[9] if len(row_pro) > 9 else "").strip()
+                        row_pro = pad_fila(pro_by_dni[it["dni"]], PRO_COLS)
+                        cartera_raw = str(row_pro[9]).strip()
                         cartera = "Comafi" if es_banco_comafi(cartera_raw) else cartera_raw
                         
                         base_row = [
                             it["dni"],                                     # A: DNI
-                            str(row_pro[3] if len(row_pro) > 3 else ""),   # B: Nombre
+                            str(row_pro[3]),                               # B: Nombre
                             fecha_fmt,                                     # C: Fecha
                             "",                                            # D: Importe (se pisa)
                             "",                                            # E: Concepto
                             "",                                            # F: Tipo de Pago
                             "",                                            # G: Nro de Cuota
-                            str(row_pro[7] if len(row_pro) > 7 else ""),   # H: Total Cuotas
+                            str(row_pro[7]),                               # H: Total Cuotas
                             cartera,                                       # I: Cartera
                             "",                                            # J: Cartera Cta.
                             "",                                            # K: Producto Cta.
-                            str(row_pro[4] if len(row_pro) > 4 else ""),   # L: Operador
+                            str(row_pro[4]),                               # L: Operador
                             detectar_entidades(cartera_raw),               # M: Entidad
                             "",                                            # N: Cta. Destino (se pisa)  
                             "",                                            # O: Observaciones
                             "",                                            # P: Transferido (se pisa)
                             dia_habil,                                     # Q: Nº Día
-                            str(row_pro[8] if len(row_pro) > 8 else ""),   # R: ID
+                            str(row_pro[8]),                               # R: ID
                             1,                                             # S: Tipo Doc
                             it["dni"],                                     # T: NUMEDOCU
                             fecha_fmt,                                     # U: FECHPAGO
@@ -277,13 +312,12 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
                         continue
 
             # Asegurar longitud exacta
-            while len(base_row) < COLS_OUT:
-                base_row.append("")
             base_row = base_row[:COLS_OUT]
+            base_row += [""] * (COLS_OUT - len(base_row))
 
             # Modificar para honorario
             importe_fmt = extraer_solo_numeros_crudos(it["monto_raw"])
-            monto_sin = limpiar_monto_sin_decimales(it["monto_raw"])
+            monto_sin = it["monto_sin"]
 
             base_row[2] = fecha_fmt     # C Fecha
             base_row[3] = importe_fmt   # D Importe
@@ -311,6 +345,8 @@ def ejecutar_honorarios(sheets: SheetsIO) -> Dict[str, Any]:
         # Escritura batch única
         if appends:
             sheets.escribir_filas_mes(hoja_nombre, appends)
+            sheet_cache.pop(hoja_nombre, None)
+            dni_index_cache.pop(hoja_nombre, None)
 
     # =========================================================
     # 3) LIMPIAR + ESCRIBIR ESTADOS EN Q (vector completo)
@@ -2,15 +2,40 @@
 calendar_ar.py — Feriados argentinos + cálculo de días hábiles
 """
 
+import calendar
+import json
 import logging
+import os
+import time
 from datetime import date, timedelta
-from typing import Set, Optional
+from functools import lru_cache
+from typing import FrozenSet, Set, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
-# Cache de feriados por año
+# Cache de feriados por año (en proceso)
 _feriados_cache: dict = {}
 
+# Cache en disco compartido entre workers / reinicios de la instancia
+FERIADOS_CACHE_DIR = os.environ.get("FERIADOS_CACHE_DIR", "/tmp/feriados")
+FERIADOS_CACHE_TTL = 30 * 86400  # segundos
+API_MAX_REINTENTOS = 3
+API_BACKOFF = 0.3  # segundos (factor de backoff de urllib3)
+
+# Sesión HTTP reutilizable: keep-alive entre años + reintentos en 429/5xx
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=API_MAX_REINTENTOS,
+    backoff_factor=API_BACKOFF,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+    raise_on_status=False,
+)))
+
 # Fallback hardcodeado
 FERIADOS_FALLBACK = {
     2024: [
@@ -33,42 +58,84 @@ FERIADOS_FALLBACK = {
     ],
 }
 
+# Fallback ya convertido a date (una sola vez, al importar)
+FERIADOS_FALLBACK_DATES: dict = {
+    year: frozenset(date.fromisoformat(f) for f in fechas)
+    for year, fechas in FERIADOS_FALLBACK.items()
+}
+
 
-def get_feriados(year: int) -> Set[str]:
-    """Retorna set de feriados como 'YYYY-MM-DD' para el año dado."""
-    if year in _feriados_cache:
-        return _feriados_cache[year]
+def _cache_path(year: int) -> str:
+    return os.path.join(FERIADOS_CACHE_DIR, f"{year}.json")
 
-    feriados = set()
 
-    # Intentar API
+def _leer_cache_disco(year: int) -> Optional[Set[str]]:
+    """Lee feriados cacheados en disco si existen y no vencieron."""
+    path = _cache_path(year)
     try:
-        import requests
-        resp = requests.get(
+        if time.time() - os.path.getmtime(path) > FERIADOS_CACHE_TTL:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_cache_disco(year: int, feriados: Set[str]):
+    """Persiste feriados en disco (escritura atómica vía rename)."""
+    path = _cache_path(year)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(FERIADOS_CACHE_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(feriados), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar cache de feriados {year}: {e}")
+
+
+def _feriados_desde_api(year: int) -> Set[str]:
+    """Consulta date.nager.at (reintentos en la sesión). Retorna set vacío si falla."""
+    try:
+        resp = _session.get(
             f"https://date.nager.at/api/v3/PublicHolidays/{year}/AR",
             timeout=5,
         )
         if resp.status_code == 200:
-            data = resp.json()
-            feriados = {f["date"] for f in data}
+            feriados = {f["date"] for f in resp.json()}
             logger.info(f"Feriados {year} desde API: {len(feriados)}")
+            return feriados
+        logger.warning(f"API feriados {year} respondió {resp.status_code}")
     except Exception as e:
         logger.warning(f"API feriados falló para {year}: {e}")
+    return set()
+
+
+def get_feriados(year: int) -> FrozenSet[date]:
+    """Retorna frozenset de feriados (date) para el año dado."""
+    if year in _feriados_cache:
+        return _feriados_cache[year]
+
+    # Intentar cache en disco, luego API
+    feriados = _leer_cache_disco(year)
+    if feriados is None:
+        feriados = _feriados_desde_api(year)
+        if feriados:
+            _guardar_cache_disco(year, feriados)
 
     # Merge con fallback
-    fallback = set(FERIADOS_FALLBACK.get(year, []))
-    feriados = feriados | fallback
+    fallback = FERIADOS_FALLBACK_DATES.get(year, frozenset())
+    resultado = frozenset(date.fromisoformat(f) for f in feriados) | fallback
 
-    _feriados_cache[year] = feriados
-    return feriados
+    _feriados_cache[year] = resultado
+    return resultado
 
 
 def es_dia_habil(d: date) -> bool:
     """True si no es fin de semana ni feriado."""
     if d.weekday() >= 5:  # 5=sáb, 6=dom
         return False
-    feriados = get_feriados(d.year)
-    return d.isoformat() not in feriados
+    return d not in get_feriados(d.year)
 
 
 def proximo_dia_habil(d: date) -> date:
@@ -78,11 +145,28 @@ def proximo_dia_habil(d: date) -> date:
     return d
 
 
+@lru_cache(maxsize=64)
+def _habiles_acumulados(anio: int, mes: int) -> Tuple[int, ...]:
+    """
+    Prefijo de días hábiles del mes (mes 1-based): acum[d] = hábiles del 1 al d.
+    Se calcula una vez por (anio, mes); acum[0] = 0.
+    """
+    feriados = get_feriados(anio)
+    primer_weekday, dias_mes = calendar.monthrange(anio, mes)
+    acum = [0] * (dias_mes + 1)
+    for d_num in range(1, dias_mes + 1):
+        es_habil = (primer_weekday + d_num - 1) % 7 < 5 and date(anio, mes, d_num) not in feriados
+        acum[d_num] = acum[d_num - 1] + es_habil
+    return tuple(acum)
+
+
+@lru_cache(maxsize=512)
 def calcular_dia_habil_del_mes(dia: int, mes: int, anio: int) -> Optional[int]:
     """
     Calcula cuántos días hábiles van del 1 al día dado del mes.
     Si cae en finde/feriado, avanza al próximo hábil.
     Retorna el número de día hábil (1-based) o None.
+    Memoizada: un lote de pagos repite pocas combinaciones (dia, mes, anio).
     """
     try:
         fecha_original = date(anio, mes + 1, dia)  # mes+1 porque mesIdx es 0-based
@@ -92,14 +176,7 @@ def calcular_dia_habil_del_mes(dia: int, mes: int, anio: int) -> Optional[int]:
     # Mover a día hábil si es necesario
     fecha = proximo_dia_habil(fecha_original)
 
-    # Si cruzó de año, recargar feriados
-    feriados = get_feriados(fecha.year)
-
-    # Contar hábiles del 1 al día
-    habiles = 0
-    for d_num in range(1, fecha.day + 1):
-        d = date(fecha.year, fecha.month, d_num)
-        if d.weekday() < 5 and d.isoformat() not in feriados:
-            habiles += 1
+    # Contar hábiles del 1 al día (prefijo cacheado por mes; si cruzó de año usa el nuevo)
+    habiles = _habiles_acumulados(fecha.year, fecha.month)[fecha.day]
 
     return habiles if habiles > 0 else None
\ No newline at end of file
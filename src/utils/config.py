@@ -7,7 +7,7 @@ import os
 SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID", "")
 
 # ─── Headers de hojas mensuales (25 columnas) ───
-HEADERS_MES = [
+HEADERS_MES = (
     "DNI",              # A  (0)
     "Nombre",           # B  (1)
     "Fecha",            # C  (2)
@@ -33,20 +33,23 @@ HEADERS_MES = [
     "TPO_ORIG",         # W  (22)
     "MANGO",            # X  (23)
     "Honorario",        # Y  (24)
-]
+)
 
 # ─── Meses ───
 MESES_ES = [
     "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
     "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
 ]
+MESES_ES_LOWER = tuple(m.lower() for m in MESES_ES)  # "enero", … (para matching)
 MESES_ABREV = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
 
 # ─── Mapping canal de pago → código ───
+# Claves en forma normalize_canal (minúsculas, solo [a-z0-9]): es como se
+# buscan. Las variantes con mayúsculas/espacios/puntos nunca matcheaban y se
+# quitaron; "Cta. Mins" (34) no tiene equivalente ("ctamins") y sigue en 0.
 CANAL_TO_CODE = {
     "banco": 2,
     "estudio": 1,
-    "Estudio": 1,
     "ctacomafi": 25,
     "ctacreditia": 24,
     "rapipago": 5,
@@ -59,16 +62,6 @@ CANAL_TO_CODE = {
     "efectivosi": 32,
     "ctaefectivosi": 33,
     "mins": 66,
-    "Cta Creditia": 24, 
-    "Cta. Mins": 34,
-    "Cta Mins": 34,
-    "cta Efetivo Si": 33,
-    "Cta. Mins": 34,
-    "Cta. Creditia": 24,
-    "Cta. Mins ": 34,
-    "Cta. RDA": 31,
-    "Cta. Comafi": 25,
-    "Banco ": 2,
 }
 
 # ─── Entidades conocidas ───
@@ -4,9 +4,24 @@ parsers.py — Parseo de fechas y extracción de DNI desde filenames
 
 import re
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, List, Union
 
-from src.utils.config import MESES_ABREV, MESES_ES
+from src.utils.config import MESES_ABREV, MESES_ES, MESES_ES_LOWER
+
+# ─── Patrones precompilados (se usan fila a fila) ───
+_DNI_HONORARIO_RX = re.compile(r"^\s*(\d{6,12})\s*[hH]\b")
+_MARCA_HONORARIO_RX = re.compile(r"\b[a-z]*h\b", re.IGNORECASE)
+_DNI_CUALQUIERA_RX = re.compile(r"(\d{6,12})")
+_FECHA_DMY_RX = re.compile(r"^(\d{1,2})[/\-\s](\d{1,2})[/\-\s](\d{2,4})(?:[ T].*)?$")
+_FECHA_ISO_RX = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[T\s].*)?$")
+_FECHA_DMMMY_RX = re.compile(r"^(\d{1,2})[/\-\s]([A-Za-z]+)[/\-\s](\d{2,4}).*$")
+
+# Abreviatura de mes → índice 0-based (incluye el alias 'sept')
+_MES_IDX: Dict[str, int] = {abrev: i for i, abrev in enumerate(MESES_ABREV)}
+_MES_IDX["sept"] = _MES_IDX["sep"]
+
+# Días con cero a la izquierda ("01" … "31") para formato_fecha_corta
+_DD = tuple(f"{d:02d}" for d in range(32))
 
 
 def extraer_dni_desde_archivo(archivo: str) -> str:
@@ -18,17 +33,19 @@ def extraer_dni_desde_archivo(archivo: str) -> str:
         return ""
     s = str(archivo).strip()
 
-    # Si contiene H/h como marca → descartar (es honorario)
-    if re.search(r"\b[a-z]*h\b", s, re.IGNORECASE):
+    # Si contiene H/h como marca → descartar (es honorario); sin 'h'/'H' no hay marca
+    if ("h" in s or "H" in s) and _MARCA_HONORARIO_RX.search(s):
         return ""
 
-    # Buscar DNI al inicio
-    m = re.match(r"^\s*(\d{6,12})\b", s)
-    if m:
-        return m.group(1)
+    # Buscar DNI al inicio: r"^(\d{6,12})\b" sin regex (es el caso común)
+    i, n = 0, len(s)
+    while i < n and s[i].isdecimal():
+        i += 1
+    if 6 <= i <= 12 and (i == n or not (s[i].isalnum() or s[i] == "_")):
+        return s[:i]
 
     # Buscar DNI en cualquier parte
-    m = re.search(r"(\d{6,12})", s)
+    m = _DNI_CUALQUIERA_RX.search(s)
     return m.group(1) if m else ""
 
 
@@ -39,7 +56,11 @@ def extraer_dni_honorario(archivo: str) -> str:
     """
     if not archivo:
         return ""
-    m = re.match(r"^\s*(\d{6,12})\s*[hH]\b", str(archivo).strip())
+    s = str(archivo).strip()
+    # Prefiltro: sin 'h'/'H' no puede ser honorario (la mayoría de los archivos)
+    if "h" not in s and "H" not in s:
+        return ""
+    m = _DNI_HONORARIO_RX.match(s)
     return m.group(1) if m else ""
 
 
@@ -59,8 +80,20 @@ def parsear_fecha_flexible(input_val) -> Optional[Dict]:
     if not s:
         return None
 
+    # Camino rápido: 'DD/MM/YYYY' exacto (el caso común) sin pasar por regex
+    if len(s) == 10 and s[2] in "/-" and s[5] in "/-" and s.isascii():
+        d_txt, m_txt, a_txt = s[0:2], s[3:5], s[6:10]
+        if d_txt.isdigit() and m_txt.isdigit() and a_txt.isdigit():
+            dia = int(d_txt)
+            mes = int(m_txt) - 1
+            anio = int(a_txt)
+            if anio < 100:
+                anio += 2000
+            if 1 <= dia <= 31 and 0 <= mes <= 11:
+                return {"dia": dia, "mesIdx": mes, "anio": anio}
+
     # DD/MM/YYYY o DD-MM-YYYY (con hora opcional)
-    m = re.match(r"^(\d{1,2})[/\-\s](\d{1,2})[/\-\s](\d{2,4})(?:[ T].*)?$", s)
+    m = _FECHA_DMY_RX.match(s)
     if m:
         dia = int(m.group(1))
         mes = int(m.group(2)) - 1
@@ -71,7 +104,7 @@ def parsear_fecha_flexible(input_val) -> Optional[Dict]:
             return {"dia": dia, "mesIdx": mes, "anio": anio}
 
     # YYYY-MM-DD (ISO)
-    m = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[T\s].*)?$", s)
+    m = _FECHA_ISO_RX.match(s)
     if m:
         anio = int(m.group(1))
         mes = int(m.group(2)) - 1
@@ -81,7 +114,7 @@ def parsear_fecha_flexible(input_val) -> Optional[Dict]:
 
     # DD/MMM/YYYY o DD-MMM-YYYY (con o sin basura después)
     # Ej: "27/FEB/2026 - 08:10", "27-febrero-26"
-    m = re.match(r"^(\d{1,2})[/\-\s]([A-Za-z]+)[/\-\s](\d{2,4}).*$", s)
+    m = _FECHA_DMMMY_RX.match(s)
     if m:
         dia = int(m.group(1))
         mes_str = m.group(2).lower()
@@ -91,8 +124,8 @@ def parsear_fecha_flexible(input_val) -> Optional[Dict]:
         
         # Buscar índice del mes
         mes_idx = -1
-        for i, (abrev, es) in enumerate(zip(MESES_ABREV, MESES_ES)):
-            if mes_str.startswith(abrev) or mes_str == es.lower() or (mes_str == "sept" and abrev == "sep"):
+        for i, (abrev, es_lower) in enumerate(zip(MESES_ABREV, MESES_ES_LOWER)):
+            if mes_str.startswith(abrev) or mes_str == es_lower or (mes_str == "sept" and abrev == "sep"):
                 mes_idx = i
                 break
                 
@@ -117,6 +150,35 @@ def parsear_fecha_flexible(input_val) -> Optional[Dict]:
     return None
 
 
+def _parsear_fecha_o_error(input_val) -> Union[Dict, None, Exception]:
+    """parsear_fecha_flexible, pero devuelve la excepción en vez de lanzarla."""
+    try:
+        return parsear_fecha_flexible(input_val)
+    except Exception as e:
+        return e
+
+
+def parsear_fechas(valores: Iterable) -> List[Union[Dict, None, Exception]]:
+    """
+    parsear_fecha_flexible sobre una columna, parseando una sola vez cada
+    texto distinto (un lote repite pocas fechas). El memo vive solo durante
+    la llamada: los fallbacks dependen de la fecha actual.
+    Si un valor lanza, en su lugar va la excepción (la relanza quien procesa
+    esa fila), así un valor roto no corta toda la columna.
+    Los dicts devueltos se comparten entre filas iguales: no mutarlos.
+    """
+    memo: Dict[str, Union[Dict, None, Exception]] = {}
+    out: List[Union[Dict, None, Exception]] = []
+    for v in valores:
+        if isinstance(v, str):
+            if v not in memo:
+                memo[v] = _parsear_fecha_o_error(v)
+            out.append(memo[v])
+        else:
+            out.append(_parsear_fecha_o_error(v))
+    return out
+
+
 def parsear_dia_mes_texto(texto: str) -> Optional[Dict]:
     """
     Parsea formato 'DD-mmm' (ej: '07-feb').
@@ -132,25 +194,21 @@ def parsear_dia_mes_texto(texto: str) -> Optional[Dict]:
     except ValueError:
         return None
 
-    mes_txt = parts[1].strip()
-    # Alias
-    if mes_txt == "sept":
-        mes_txt = "sep"
-
-    if mes_txt in MESES_ABREV:
-        mes_idx = MESES_ABREV.index(mes_txt)
-        if 1 <= dia <= 31:
-            return {"dia": dia, "mesIdx": mes_idx}
+    mes_idx = _MES_IDX.get(parts[1].strip())
+    if mes_idx is not None and 1 <= dia <= 31:
+        return {"dia": dia, "mesIdx": mes_idx}
 
     return None
 
 
 def nombre_hoja_mes(mes_idx: int, anio: int) -> str:
     """Genera nombre de hoja: 'Febrero 26'."""
-    anio_corto = str(anio)[-2:]
+    # anio % 100 con dos dígitos == str(anio)[-2:] para años de 2+ cifras
+    anio_corto = f"{anio % 100:02d}" if anio >= 10 else str(anio)
     return f"{MESES_ES[mes_idx]} {anio_corto}"
 
 
 def formato_fecha_corta(dia: int, mes_idx: int) -> str:
     """Formatea fecha como 'DD-mmm' (ej: '07-feb')."""
-    return f"{str(dia).zfill(2)}-{MESES_ABREV[mes_idx]}"
\ No newline at end of file
+    dd = _DD[dia] if 0 <= dia < 32 else str(dia).zfill(2)
+    return f"{dd}-{MESES_ABREV[mes_idx]}"
\ No newline at end of file
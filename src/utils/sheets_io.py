@@ -8,16 +8,21 @@ Optimizaciones:
 - Escritura en chunks para evitar OOM y timeouts de la API
 - Retry automático con backoff exponencial en errores transitorios
 - Logging mejorado con tiempos de ejecución
+- Cliente gspread (y sesión HTTP con keep-alive) compartido por el proceso
 """
 
 import logging
+import random
+import threading
 import time
+from collections import OrderedDict
 from typing import List, Any, Dict, Tuple, Optional
 
 import gspread
 from gspread.exceptions import APIError, WorksheetNotFound
 import google.auth
 from google.auth.transport.requests import Request as AuthRequest
+from requests.adapters import HTTPAdapter
 
 from src.utils.config import HEADERS_MES
 
@@ -30,23 +35,88 @@ SCOPES = [
 
 # ─── Configuración de batching y retry ───────────────────
 BATCH_SIZE = 500          # filas por lectura/escritura
-MAX_RETRIES = 3           # reintentos en errores transitorios
+MAX_RETRIES = 5           # intentos en errores transitorios (cuota de 60 req/min)
 RETRY_BASE_DELAY = 2      # segundos base entre reintentos
+RETRY_MAX_DELAY = 32      # tope del backoff exponencial (segundos)
+RETRY_JITTER = 1.0        # jitter aleatorio sumado a cada espera (segundos)
 RETRY_CODES = {429, 500, 502, 503}  # HTTP codes que merecen retry
+HISTORICO_MAX_CELDAS = 50_000  # celdas por append a 'Historico' (~1-2 MB de payload)
+HTTP_POOL_SIZE = 16       # conexiones keep-alive a la API (gunicorn usa 8 threads)
+PLANILLAS_MAX = 8         # spreadsheets abiertos que se recuerdan por proceso
+
+
+def _letras_columna(n: int) -> str:
+    """Columna 1-based → letras en base 26 (1 → A, 27 → AA)."""
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+# Letras de columna precalculadas (A … ZZ); índice = columna 1-based
+_COL_LETTERS = [""] + [_letras_columna(c) for c in range(1, 703)]
 
 # Credenciales globales
 _creds, _ = google.auth.default(scopes=SCOPES)
 _auth_req = AuthRequest()
 
 
+# Cliente gspread compartido por el proceso (una sola sesión HTTP con pool)
+_gc: Optional[gspread.Client] = None
+_gc_lock = threading.Lock()
+# Spreadsheets ya abiertos (open_by_key es un GET de metadata por instancia),
+# LRU acotado a PLANILLAS_MAX
+_planillas: "OrderedDict[str, gspread.Spreadsheet]" = OrderedDict()
+
+
 def _refresh():
     if not _creds.valid:
         _creds.refresh(_auth_req)
 
 
+def _get_client() -> gspread.Client:
+    """Retorna el cliente gspread del proceso, autorizándolo la primera vez."""
+    global _gc
+    _refresh()
+    if _gc is None:
+        with _gc_lock:
+            if _gc is None:
+                gc = gspread.authorize(_creds)
+                session = getattr(getattr(gc, "http_client", gc), "session", None)
+                if session is not None:
+                    session.mount("https://", HTTPAdapter(
+                        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+                    ))
+                _gc = gc
+    return _gc
+
+
+def _abrir_planilla(spreadsheet_id: str) -> gspread.Spreadsheet:
+    """open_by_key memoizado por proceso; las hojas se listan aparte en cada SheetsIO."""
+    with _gc_lock:
+        sh = _planillas.get(spreadsheet_id)
+        if sh is not None:
+            _planillas.move_to_end(spreadsheet_id)
+            return sh
+    sh = _get_client().open_by_key(spreadsheet_id)
+    with _gc_lock:
+        sh = _planillas.setdefault(spreadsheet_id, sh)
+        _planillas.move_to_end(spreadsheet_id)
+        while len(_planillas) > PLANILLAS_MAX:
+            _planillas.popitem(last=False)
+    return sh
+
+
+def _backoff(attempt: int) -> float:
+    """Espera truncada exponencial + jitter (evita que los workers reintenten a la vez)."""
+    delay = min(RETRY_BASE_DELAY * (2 ** (attempt - 1)), RETRY_MAX_DELAY)
+    return delay + random.uniform(0, RETRY_JITTER)
+
+
 def _retry_api_call(func, *args, **kwargs):
     """
-    Ejecuta una llamada a la API con retry + backoff exponencial.
+    Ejecuta una llamada a la API con retry + backoff exponencial con jitter.
     Reintenta en errores 429 (rate limit), 500, 502, 503.
     """
     last_err = None
@@ -58,25 +128,35 @@ def _retry_api_call(func, *args, **kwargs):
             code = e.response.status_code if hasattr(e, "response") else 0
             if code not in RETRY_CODES or attempt == MAX_RETRIES:
                 raise
-            delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))
+            delay = _backoff(attempt)
             logger.warning(
                 f"API error {code} en intento {attempt}/{MAX_RETRIES}, "
-                f"reintentando en {delay}s: {e}"
+                f"reintentando en {delay:.1f}s: {e}"
             )
             time.sleep(delay)
         except Exception as e:
             last_err = e
             if attempt == MAX_RETRIES:
                 raise
-            delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))
+            delay = _backoff(attempt)
             logger.warning(
                 f"Error transitorio en intento {attempt}/{MAX_RETRIES}, "
-                f"reintentando en {delay}s: {e}"
+                f"reintentando en {delay:.1f}s: {e}"
             )
             time.sleep(delay)
     raise last_err
 
 
+def pad_fila(row: List, width: int) -> List:
+    """
+    Completa la fila con '' hasta width columnas (get_all_values no rellena
+    las celdas vacías del final). Devuelve la misma fila si ya alcanza.
+    """
+    if len(row) >= width:
+        return row
+    return list(row) + [""] * (width - len(row))
+
+
 def _write_column_batched(ws: gspread.Worksheet, col_letter: str,
                           values: List[Any], start_row: int = 2):
     """
@@ -92,10 +172,10 @@ def _write_column_batched(ws: gspread.Worksheet, col_letter: str,
         row_start = start_row + offset
         row_end = row_start + len(chunk) - 1
         rng = f"{col_letter}{row_start}:{col_letter}{row_end}"
-        payload = [[v] for v in chunk]
-
+        # majorDimension=COLUMNS: la columna viaja como una sola lista
         _retry_api_call(
-            ws.update, rng, payload, value_input_option="USER_ENTERED"
+            ws.update, rng, [list(chunk)],
+            value_input_option="USER_ENTERED", major_dimension="COLUMNS",
         )
 
         if total > BATCH_SIZE:
@@ -105,6 +185,27 @@ def _write_column_batched(ws: gspread.Worksheet, col_letter: str,
             )
 
 
+def _write_columns_one_call(ws: gspread.Worksheet, columnas: Dict[str, List[Any]],
+                            start_row: int = 2):
+    """
+    Escribe una o más columnas completas ({letra: valores}) en un único
+    values.batchUpdate: un solo round-trip en vez de uno por chunk.
+    Con majorDimension=COLUMNS cada columna va como una lista, sin [v] por fila.
+    """
+    data = [
+        {
+            "range": f"{col_letter}{start_row}:{col_letter}{start_row + len(values) - 1}",
+            "majorDimension": "COLUMNS",
+            "values": [list(values)],
+        }
+        for col_letter, values in columnas.items()
+        if values
+    ]
+    if not data:
+        return
+    _retry_api_call(ws.batch_update, data, value_input_option="USER_ENTERED")
+
+
 def _read_batched(ws: gspread.Worksheet, batch_size: int = BATCH_SIZE) -> List[List[Any]]:
     """
     Lee una hoja en bloques de filas para evitar OOM/timeout.
@@ -163,10 +264,11 @@ class SheetsIO:
     """Maneja toda la interacción con Google Sheets."""
 
     def __init__(self, spreadsheet_id: str):
-        _refresh()
-        self.gc = gspread.authorize(_creds)
-        self.sh = self.gc.open_by_key(spreadsheet_id)
+        self.gc = _get_client()
+        self.sh = _abrir_planilla(spreadsheet_id)
+        # Worksheets por título; se completa de una vez con worksheets() (lazy)
         self._hoja_cache: Dict[str, gspread.Worksheet] = {}
+        self._hojas_cargadas = False
         self._pro_cache: Optional[Tuple[List[Any], List[List[Any]]]] = None
 
     # ─────────────────────────────────────────────────────────
@@ -176,11 +278,26 @@ class SheetsIO:
     @staticmethod
     def _col_letter(col_1based: int) -> str:
         """Convierte número de columna 1-based a letra (A, B, ..., AA, AB...)."""
-        return gspread.utils.rowcol_to_a1(1, col_1based).rstrip("1")
+        if 0 < col_1based < len(_COL_LETTERS):
+            return _COL_LETTERS[col_1based]
+        return _letras_columna(col_1based)
+
+    @staticmethod
+    def _a1_hoja(nombre: str) -> str:
+        """Nombre de hoja citado para notación A1 ('Febrero 26')."""
+        return "'" + nombre.replace("'", "''") + "'"
 
     def _get_ws(self, nombre: str) -> gspread.Worksheet:
-        """Obtiene worksheet por nombre."""
-        return self.sh.worksheet(nombre)
+        """
+        Obtiene worksheet por nombre desde el cache de hojas; si no está
+        (creada afuera después de listar) la busca en la API.
+        Lanza WorksheetNotFound si no existe.
+        """
+        ws = self._hojas().get(nombre)
+        if ws is None:
+            ws = self.sh.worksheet(nombre)
+            self._hoja_cache[nombre] = ws
+        return ws
 
     def _ensure_col_count(self, ws: gspread.Worksheet, min_cols: int):
         """Asegura que la hoja tenga al menos min_cols columnas."""
@@ -194,12 +311,32 @@ class SheetsIO:
     def leer_hoja(self, nombre: str) -> List[List[Any]]:
         """Lee todos los datos de una hoja (incluye header)."""
         try:
-            ws = self.sh.worksheet(nombre)
+            ws = self._get_ws(nombre)
             return _retry_api_call(ws.get_all_values)
         except WorksheetNotFound:
             logger.warning(f"Hoja '{nombre}' no encontrada")
             return []
 
+    def leer_hojas(self, nombres: List[str], rango: str) -> Dict[str, List[List[Any]]]:
+        """
+        Lee un rango (A1 sin hoja, ej: 'A:C') de varias hojas en una sola
+        llamada values.batchGet. Las hojas deben existir. Las filas no vienen
+        rellenadas a ancho fijo como en get_all_values.
+        """
+        if not nombres:
+            return {}
+        ranges = [f"{self._a1_hoja(n)}!{rango}" for n in nombres]
+        t0 = time.time()
+        resp = _retry_api_call(self.sh.values_batch_get, ranges)
+        value_ranges = resp.get("valueRanges", [])
+        result = {
+            n: vr.get("values", []) for n, vr in zip(nombres, value_ranges)
+        }
+        logger.info(
+            f"leer_hojas(): {len(nombres)} hojas en {time.time()-t0:.1f}s"
+        )
+        return result
+
     def leer_hoja_sin_header(self, nombre: str) -> List[List[Any]]:
         """Lee datos sin la fila de header."""
         data = self.leer_hoja(nombre)
@@ -221,7 +358,7 @@ class SheetsIO:
 
         t0 = time.time()
         try:
-            ws = self.sh.worksheet("Pro")
+            ws = self._get_ws("Pro")
             data = _read_batched(ws)
         except WorksheetNotFound:
             logger.warning("Hoja 'Pro' no encontrada")
@@ -245,28 +382,89 @@ class SheetsIO:
     # Hojas mensuales
     # ─────────────────────────────────────────────────────────
 
+    def _hojas(self) -> Dict[str, gspread.Worksheet]:
+        """Worksheets por título; la primera vez se bajan todas en una llamada."""
+        if not self._hojas_cargadas:
+            for ws in _retry_api_call(self.sh.worksheets):
+                self._hoja_cache.setdefault(ws.title, ws)
+            self._hojas_cargadas = True
+        return self._hoja_cache
+
+    def titulos_hojas(self) -> set:
+        """Títulos de las hojas existentes (incluye las creadas por esta instancia)."""
+        return set(self._hojas())
+
     def obtener_o_crear_hoja_mes(self, nombre: str) -> gspread.Worksheet:
         """Obtiene o crea una hoja mensual con headers."""
-        if nombre in self._hoja_cache:
-            return self._hoja_cache[nombre]
+        ws = self._hojas().get(nombre)
+        if ws is not None:
+            return ws
 
         try:
+            ws = self._crear_hoja_con_header(nombre)
+        except APIError as e:
+            # Solo "ya existe" (creada por otro proceso después de listar las
+            # hojas); 429/5xx y demás errores se propagan
+            if e.response.status_code != 400 or "already exists" not in str(e):
+                raise
             ws = self.sh.worksheet(nombre)
-        except WorksheetNotFound:
-            ws = self.sh.add_worksheet(
-                title=nombre, rows=1000, cols=len(HEADERS_MES)
-            )
-            _retry_api_call(
-                ws.append_row, HEADERS_MES, value_input_option="USER_ENTERED"
-            )
+        else:
             logger.info(f"Creada hoja '{nombre}'")
 
         self._hoja_cache[nombre] = ws
         return ws
 
-    def leer_hoja_mes(self, nombre: str) -> List[List[Any]]:
-        """Lee datos de una hoja mensual (con header)."""
+    def _crear_hoja_con_header(self, nombre: str) -> gspread.Worksheet:
+        """
+        addSheet + header (fila 1) en un solo spreadsheets.batchUpdate. El
+        sheetId se elige acá para poder apuntar el updateCells a la hoja nueva;
+        el Worksheet se arma con las properties de la respuesta, como hace
+        add_worksheet (constructor de gspread >= 6.0.1), sin otro GET.
+        """
+        usados = {ws.id for ws in self._hoja_cache.values()}
+        sheet_id = random.randrange(1, 2 ** 31)
+        while sheet_id in usados:
+            sheet_id = random.randrange(1, 2 ** 31)
+
+        body = {
+            "requests": [
+                {
+                    "addSheet": {
+                        "properties": {
+                            "sheetId": sheet_id,
+                            "title": nombre,
+                            "sheetType": "GRID",
+                            "gridProperties": {
+                                "rowCount": 1000,
+                                "columnCount": len(HEADERS_MES),
+                            },
+                        }
+                    }
+                },
+                {
+                    "updateCells": {
+                        "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+                        "rows": [{"values": [
+                            {"userEnteredValue": {"stringValue": h}} for h in HEADERS_MES
+                        ]}],
+                        "fields": "userEnteredValue",
+                    }
+                },
+            ]
+        }
+        resp = self.sh.batch_update(body)
+        properties = resp["replies"][0]["addSheet"]["properties"]
+        return gspread.Worksheet(self.sh, properties, self.sh.id, self.sh.client)
+
+    def leer_hoja_mes(self, nombre: str, rango: Optional[str] = None) -> List[List[Any]]:
+        """
+        Lee datos de una hoja mensual (con header). Con rango (ej. "A:I") baja
+        solo esas columnas; las filas vienen rellenadas a lo ancho igual que
+        get_all_values.
+        """
         ws = self.obtener_o_crear_hoja_mes(nombre)
+        if rango:
+            return _retry_api_call(ws.get_values, rango)
         return _retry_api_call(ws.get_all_values)
 
     def escribir_filas_mes(self, nombre: str, filas: List[List[Any]]):
@@ -308,8 +506,7 @@ class SheetsIO:
             return
 
         t0 = time.time()
-        _write_column_batched(ws, "E", col_e_vals)
-        _write_column_batched(ws, "G", col_g_vals)
+        _write_columns_one_call(ws, {"E": col_e_vals, "G": col_g_vals})
         logger.info(
             f"Columnas E+G actualizadas en '{nombre}': "
             f"{total} filas en {time.time() - t0:.1f}s"
@@ -327,10 +524,19 @@ class SheetsIO:
         if not estados:
             return
         try:
-            ws = self.sh.worksheet("Informacion imagenes")
+            ws = self._get_ws("Informacion imagenes")
             self._ensure_col_count(ws, col)
             col_letter = self._col_letter(col)
-            _write_column_batched(ws, col_letter, estados)
+            # Blancos del final: un clear del tramo en vez de mandar [""] por fila
+            fin = len(estados)
+            while fin and estados[fin - 1] == "":
+                fin -= 1
+            if fin < len(estados):
+                _retry_api_call(
+                    ws.batch_clear, [f"{col_letter}{fin + 2}:{col_letter}{len(estados) + 1}"]
+                )
+            if fin:
+                _write_columns_one_call(ws, {col_letter: estados[:fin]})
         except Exception as e:
             logger.warning(f"Error escribiendo estados: {e}")
 
@@ -346,19 +552,30 @@ class SheetsIO:
             return
 
         try:
-            ws = self.sh.worksheet("Informacion imagenes")
+            ws = self._get_ws("Informacion imagenes")
             self._ensure_col_count(ws, 17)
 
-            updates = [
-                {"range": f"Q{int(idx) + 2}", "values": [[str(txt)]]}
-                for idx, txt in marcas_q.items()
-            ]
-
-            for offset in range(0, len(updates), BATCH_SIZE):
-                chunk = updates[offset: offset + BATCH_SIZE]
-                _retry_api_call(
-                    ws.batch_update, chunk, value_input_option="USER_ENTERED"
-                )
+            # Filas consecutivas → un solo rango Q{a}:Q{b} por tramo
+            updates = []
+            tramo: List[str] = []
+            inicio = previo = None
+            # int(): también se aceptan índices como texto ('3')
+            marcas = sorted(((int(i), str(t)) for i, t in marcas_q.items()),
+                            key=lambda it: it[0])
+            for idx, txt in marcas:
+                if previo is not None and idx != previo + 1:
+                    updates.append({"range": f"Q{inicio + 2}:Q{previo + 2}",
+                                    "majorDimension": "COLUMNS", "values": [tramo]})
+                    tramo = []
+                    inicio = None
+                if inicio is None:
+                    inicio = idx
+                tramo.append(txt)
+                previo = idx
+            updates.append({"range": f"Q{inicio + 2}:Q{previo + 2}",
+                            "majorDimension": "COLUMNS", "values": [tramo]})
+
+            _retry_api_call(ws.batch_update, updates, value_input_option="USER_ENTERED")
 
         except Exception as e:
             logger.warning(f"Error escribiendo estados honorarios en Q: {e}")
@@ -371,25 +588,25 @@ class SheetsIO:
             return
 
         try:
-            ws = self.sh.worksheet("Informacion imagenes")
+            ws = self._get_ws("Informacion imagenes")
             self._ensure_col_count(ws, 17)
 
             total_rows = ws.row_count
             data_rows = total_rows - 1
-
-            values = list(logs_q)
-            if len(values) < data_rows:
-                values.extend([""] * (data_rows - len(values)))
-            values = values[:data_rows]
-
-            if not values:
+            if data_rows <= 0:
                 return
 
+            n = min(len(logs_q), data_rows)
+
             t0 = time.time()
-            _write_column_batched(ws, "Q", values)
+            # Resto de la columna: clear en vez de mandar [[""], [""], …]
+            if n < data_rows:
+                _retry_api_call(ws.batch_clear, [f"Q{n + 2}:Q{total_rows}"])
+            if n:
+                _write_columns_one_call(ws, {"Q": list(logs_q[:n])})
             logger.info(
                 f"Columna Q actualizada: {len(logs_q)} logs, "
-                f"{len(values)} filas tocadas en {time.time() - t0:.1f}s"
+                f"{data_rows} filas tocadas en {time.time() - t0:.1f}s"
             )
 
         except Exception as e:
@@ -404,18 +621,23 @@ class SheetsIO:
         if not filas:
             return
         try:
-            ws = self.sh.worksheet("Historico")
+            ws = self._get_ws("Historico")
         except WorksheetNotFound:
             ws = self.sh.add_worksheet(
                 title="Historico", rows=1000, cols=len(header)
             )
+            self._hoja_cache["Historico"] = ws
             _retry_api_call(
                 ws.append_row, header, value_input_option="RAW"
             )
             logger.info("Creada hoja 'Historico'")
 
-        for offset in range(0, len(filas), BATCH_SIZE):
-            chunk = filas[offset: offset + BATCH_SIZE]
+        # Chunks por cantidad de celdas: pocos round-trips sin pasar el tamaño
+        # de payload recomendado (con 16 columnas ≈ 3000 filas por append)
+        ancho = max(len(header), max(len(f) for f in filas), 1)
+        por_chunk = max(1, HISTORICO_MAX_CELDAS // ancho)
+        for offset in range(0, len(filas), por_chunk):
+            chunk = filas[offset: offset + por_chunk]
             _retry_api_call(
                 ws.append_rows, chunk, value_input_option="RAW"
             )
@@ -4,36 +4,63 @@ text.py — Normalización de texto, limpieza de montos, detección de canales
 
 import re
 import unicodedata
+from functools import lru_cache
+
+from src.utils.config import ENTIDADES_CONOCIDAS
+
+_NO_MONTO_RX = re.compile(r"[^\d.,]")
+_NO_ALNUM_RX = re.compile(r"[^a-z0-9]")
+
+
+def _sin_marcas(ch: str) -> str:
+    """ch en NFD sin marcas diacríticas (categoría Mn)."""
+    return "".join(c for c in unicodedata.normalize("NFD", ch) if unicodedata.category(c) != "Mn")
+
+
+# Tabla á→a, ñ→n, ü→u… (Latin-1 + Latin Extended-A), derivada de NFD para
+# dar exactamente lo mismo que el camino lento; str.translate es una pasada en C.
+TABLA_ACENTOS = {
+    ord(ch): base
+    for ch in map(chr, range(0xC0, 0x180))
+    if (base := _sin_marcas(ch)) != ch and base.isascii()
+}
+
+_SIN_SEPARADORES = str.maketrans("", "", " -_")
+
+
+def _a_ascii(txt: str) -> str:
+    """NFD + descartar lo no-ASCII; con tabla si alcanza (texto en castellano)."""
+    if txt.isascii():
+        return txt
+    out = txt.translate(TABLA_ACENTOS)
+    if out.isascii():
+        return out
+    return unicodedata.normalize("NFD", txt).encode("ascii", "ignore").decode("ascii")
 
 
 def normalize(txt: str) -> str:
-    """Normaliza texto: sin acentos, sin espacios, lowercase."""
+    """Normaliza texto: sin acentos, sin espacios, lowercase. Memoizada (DNI/cartera se repiten)."""
     if not txt:
         return ""
-    return (
-        unicodedata.normalize("NFD", str(txt))
-        .encode("ascii", "ignore")
-        .decode("ascii")
-        .lower()
-        .replace(" ", "")
-        .replace("-", "")
-        .replace("_", "")
-        .strip()
-    )
+    # Cache sobre el str: la celda puede venir como int/bool (True == 1 para lru_cache)
+    return _normalize_str(str(txt))
+
+
+@lru_cache(maxsize=16384)
+def _normalize_str(txt: str) -> str:
+    return _a_ascii(txt).lower().translate(_SIN_SEPARADORES).strip()
 
 
 def normalize_canal(txt: str) -> str:
-    """Normaliza para matching de canal de pago."""
+    """Normaliza para matching de canal de pago. Memoizada (emisores/destinos se repiten)."""
     if not txt:
         return ""
-    return re.sub(
-        r"[^a-z0-9]",
-        "",
-        unicodedata.normalize("NFD", str(txt))
-        .encode("ascii", "ignore")
-        .decode("ascii")
-        .lower(),
-    )
+    return _normalize_canal_str(str(txt))
+
+
+@lru_cache(maxsize=4096)
+def _normalize_canal_str(txt: str) -> str:
+    return _NO_ALNUM_RX.sub("", _a_ascii(txt).lower())
 
 
 def extraer_solo_numeros_crudos(texto) -> str:
@@ -41,7 +68,13 @@ def extraer_solo_numeros_crudos(texto) -> str:
     Extrae el monto como string preservando puntos y comas.
     Ej: '$ 90.000,50' → '90.000,50'
     """
-    s = re.sub(r"[^\d.,]", "", str(texto or ""))
+    # Cache sobre el str: la celda puede venir como int/bool (True == 1 para lru_cache)
+    return _extraer_numeros_str(str(texto or ""))
+
+
+@lru_cache(maxsize=65536)
+def _extraer_numeros_str(texto: str) -> str:
+    s = _NO_MONTO_RX.sub("", texto)
     if "," in s and "." in s:
         last_comma = s.rfind(",")
         last_dot = s.rfind(".")
@@ -56,7 +89,12 @@ def limpiar_monto_sin_decimales(texto) -> str:
     Limpia monto quitando decimales y puntos de miles.
     Ej: '90.000,50' → '90000'
     """
-    s = extraer_solo_numeros_crudos(texto)
+    return _limpiar_monto_str(str(texto or ""))
+
+
+@lru_cache(maxsize=65536)
+def _limpiar_monto_str(texto: str) -> str:
+    s = _extraer_numeros_str(texto)
     idx = s.rfind(",")
     if idx != -1:
         s = s[:idx]
@@ -72,7 +110,15 @@ def parsear_monto_float(texto) -> float:
     if texto is None:
         return 0.0
     s = str(texto).strip()
-    s = re.sub(r"[^\d.,]", "", s)
+    # Fast path: solo dígitos ASCII ('120000') → nada que limpiar ni reinterpretar
+    if s.isascii() and s.isdigit():
+        return float(s)
+    return _parsear_monto_str(s)
+
+
+@lru_cache(maxsize=4096)
+def _parsear_monto_str(s: str) -> float:
+    s = _NO_MONTO_RX.sub("", s)
     if not s:
         return 0.0
 
@@ -117,10 +163,29 @@ def es_banco_comafi(txt: str) -> bool:
     return "bancocomafi" in n or "comafi" in n
 
 
+def canal_por_emisor(txt: str) -> str:
+    """
+    Clasifica el emisor con una sola normalización:
+    'Banco' (Comafi), 'Pago Facil', 'Rapipago' o '' si no es ninguno.
+    Misma prioridad que es_banco_comafi → contiene_pago_facil → contiene_rapipago.
+    """
+    n = normalize_canal(txt or "")
+    if "comafi" in n:
+        return "Banco"
+    if "pagofacil" in n:
+        return "Pago Facil"
+    if "rapipago" in n:
+        return "Rapipago"
+    return ""
+
+
 def detectar_entidades(txt: str) -> str:
     """Detecta entidades conocidas en el texto."""
-    from src.utils.config import ENTIDADES_CONOCIDAS
+    return _detectar_entidades_str(str(txt or ""))
+
 
-    upper = str(txt or "").upper()
-    found = [e for e in ENTIDADES_CONOCIDAS if e in upper]
-    return " ".join(found)
+@lru_cache(maxsize=1024)
+def _detectar_entidades_str(txt: str) -> str:
+    # Pocas carteras distintas por corrida: cada texto se escanea una sola vez
+    upper = txt.upper()
+    return " ".join(e for e in ENTIDADES_CONOCIDAS if e in upper)